@@ -3,18 +3,27 @@ import os
 import re
 import datetime
 import asyncio
+import heapq
 
 # --- Third-party imports ---
-import requests
+import ciso8601
+import httpx
 import feedparser
 import nltk
+import orjson
 import socketio
-from dateutil import parser
-from collections import Counter, deque
+from selectolax.parser import HTMLParser
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from transformers import pipeline
+import numpy as np
+import onnxruntime as ort
+import psutil
+import xxhash
+from transformers import AutoConfig, AutoTokenizer
 
 # ==============================================================================
 # SECTION 1: INITIAL SETUP & CONFIGURATION
@@ -23,7 +32,11 @@ from transformers import pipeline
 print("Initializing NLTK stopwords...")
 nltk.download('stopwords', quiet=True)
 from nltk.corpus import stopwords
-stop_words = set(stopwords.words('english'))
+# Topic words must be 4+ chars anyway, so shorter stop words are dropped up front to keep the set small.
+stop_words = frozenset(w for w in stopwords.words('english') if len(w) > 3)
+# Runs of 4+ word characters: the same tokens as splitting on \W+ and keeping len(w) > 3,
+# but the length filter runs inside the C regex engine instead of a Python loop.
+_TOPIC_WORD = re.compile(r'\w{4,}')
 print("NLTK is ready.")
 
 load_dotenv()
@@ -32,43 +45,250 @@ gnews_api_key = os.getenv("GNEWS_API_KEY")
 if not news_api_key:
     raise ValueError("CRITICAL: NEWS_API_KEY is not set in the .env file!")
 
-print("Loading lightweight sentiment analysis model...")
-sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-print("Sentiment model loaded successfully.")
-
 API_TIMEOUT = 10
-MAX_CONTENT_LENGTH = 512
+MAX_HTML_LENGTH = 4096
+# Inputs are truncated by the tokenizer, not by characters: the model only ever sees the
+# first MAX_TOKEN_LENGTH tokens, and each batch pads only to its own longest text.
+MAX_TOKEN_LENGTH = 128
+SENTIMENT_CACHE_SIZE = 10_000
+
+# The checkpoint optimize_model.py exported; by default its files live in models/<name, "/" -> "--">.
+# Point SENTIMENT_MODEL_DIR at a shared read-only volume (e.g. /opt/models/<name>) instead: each
+# worker still reads the .onnx file into its own session, but after the first one those reads
+# come from the OS page cache rather than the disk.
+SENTIMENT_MODEL_NAME = os.getenv("SENTIMENT_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", SENTIMENT_MODEL_NAME.replace("/", "--")))
+# Every label a model may emit; the running summary in run_search_flow counts exactly these.
+SENTIMENT_LABELS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+# Produced by optimize_model.py. FP16 keeps FP32 accuracy; INT8 (avx512_vnni) is faster
+# but measurably lossier, so it is opt-in via SENTIMENT_PRECISION=int8.
+SENTIMENT_MODEL_FILES = {"fp16": "model_fp16.onnx", "int8": "model_quantized.onnx"}
+SENTIMENT_PRECISION = os.getenv("SENTIMENT_PRECISION", "fp16").lower()
+if SENTIMENT_PRECISION not in SENTIMENT_MODEL_FILES:
+    raise ValueError(f"CRITICAL: SENTIMENT_PRECISION must be one of {sorted(SENTIMENT_MODEL_FILES)}, got '{SENTIMENT_PRECISION}'!")
+# "ultrafast" swaps the transformer for the distilled static classifier (optimize_model.py --ultrafast):
+# microseconds per text at a few points of accuracy. Keep "onnx" where labels must be right.
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "onnx").lower()
+if SENTIMENT_BACKEND not in ("onnx", "ultrafast"):
+    raise ValueError(f"CRITICAL: SENTIMENT_BACKEND must be 'onnx' or 'ultrafast', got '{SENTIMENT_BACKEND}'!")
+# Texts are sorted by token count before batching, so small micro-batches keep padding to a minimum
+# while still giving the MatMul kernels batch*seq_len rows to work on.
+_batch_size = os.getenv("SENTIMENT_BATCH_SIZE", "8").strip()
+if not _batch_size.isdigit() or int(_batch_size) < 1:
+    raise ValueError(f"CRITICAL: SENTIMENT_BATCH_SIZE must be a positive integer, got '{_batch_size}'!")
+SENTIMENT_BATCH_SIZE = int(_batch_size)
+
+# Accelerated execution providers, tried in order before falling back to plain CPU. Each ships
+# in its own wheel installed *instead of* `onnxruntime`:
+#   - CUDA: `onnxruntime-gpu` on NVIDIA hosts, fp16 only (tensor cores). The int8 graph's
+#     DynamicQuantizeLinear/MatMulInteger nodes have no CUDA kernels and would fall back to CPU
+#     with host<->device copies around every MatMul, so int8 skips CUDA and runs on OpenVINO/CPU.
+#   - OpenVINO: `onnxruntime-openvino` on Intel hosts; its compiled-model cache removes first-call warmup.
+OPENVINO_PROVIDER_OPTIONS = {"device_type": "CPU_FP32", "cache_dir": "/tmp/ov_cache"}
+ACCELERATED_PROVIDERS = [("OpenVINOExecutionProvider", OPENVINO_PROVIDER_OPTIONS)]
+if SENTIMENT_PRECISION != "int8":
+    ACCELERATED_PROVIDERS.insert(0, ("CUDAExecutionProvider", {}))
+
+class ORTSentiment:
+    """Drop-in replacement for the transformers sentiment pipeline, served by ONNX Runtime."""
+
+    def __init__(self, model_dir, model_file):
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # DistilBERT is a straight chain of ops, so all threads go to parallelising each MatMul
+        # (one per physical core; hyperthreads only add contention) rather than to running ops side by side.
+        sess_options.intra_op_num_threads = psutil.cpu_count(logical=False) or os.cpu_count()
+        sess_options.inter_op_num_threads = 1
+        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Smaller dynamic work blocks balance load better across the intra-op pool.
+        sess_options.add_session_config_entry("session.dynamic_block_base", "4")
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise ValueError(f"CRITICAL: sentiment model {model_path} not found! Run `python optimize_model.py` first.")
+        self.session = None
+        available_providers = ort.get_available_providers()
+        for provider, options in ACCELERATED_PROVIDERS:
+            if provider not in available_providers: continue
+            try:
+                # CPU stays registered behind it for any node the accelerator can't run.
+                self.session = ort.InferenceSession(model_path, sess_options, providers=[provider, "CPUExecutionProvider"], provider_options=[options, {}])
+                break
+            except Exception as e: print(f"Warning: {provider} failed to load the model: {e}. Trying the next provider.")
+        if self.session is None:
+            self.session = ort.InferenceSession(model_path, sess_options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        # Normalised once here so callers never case-fold per item: some checkpoints
+        # (e.g. cardiffnlp's RoBERTa) use lowercase labels.
+        self.id2label = {idx: label.upper() for idx, label in AutoConfig.from_pretrained(model_dir).id2label.items()}
+        unsupported = set(self.id2label.values()) - set(SENTIMENT_LABELS)
+        if unsupported:
+            raise ValueError(f"CRITICAL: sentiment model labels {sorted(unsupported)} are not supported; the model must only emit {list(SENTIMENT_LABELS)}!")
+        # xxh3-64 hash of the full text -> label, oldest first. Only touched from
+        # sentiment_executor's single thread, so it needs no lock.
+        self.cache = OrderedDict()
+
+    def __call__(self, texts, batch_size=SENTIMENT_BATCH_SIZE):
+        """
+        Classifies a list of texts, returning [{"label": ...}, ...].
+        Texts seen before are answered from an LRU cache; only the misses reach the model.
+        """
+        keys = [xxhash.xxh3_64_intdigest(text) for text in texts]
+        labels = [None] * len(texts)
+        misses = []
+        for i, key in enumerate(keys):
+            label = self.cache.get(key)
+            if label is None:
+                misses.append(i)
+            else:
+                self.cache.move_to_end(key)
+                labels[i] = label
+
+        miss_labels = self._classify([texts[i] for i in misses], batch_size)
+
+        for i, label in zip(misses, miss_labels):
+            labels[i] = label
+            self.cache[keys[i]] = label
+            if len(self.cache) > SENTIMENT_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return [{"label": label} for label in labels]
+
+    def _classify(self, texts, batch_size):
+        """
+        Runs the model over `texts` in micro-batches of `batch_size`, returning one label per text.
+        Texts are tokenized once and bucketed by token count, so each batch pads only to
+        neighbours of its own length rather than to the longest text overall.
+        """
+        input_ids = self.tokenizer(texts, truncation=True, max_length=MAX_TOKEN_LENGTH)["input_ids"] if texts else []
+        order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+        labels = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            width = len(input_ids[batch[-1]])  # Sorted, so the last one is the longest.
+            ids = np.full((len(batch), width), self.tokenizer.pad_token_id, dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                ids[row, :len(input_ids[i])] = input_ids[i]
+                mask[row, :len(input_ids[i])] = 1
+            logits = self.session.run(None, {"input_ids": ids, "attention_mask": mask})[0]
+            for i, idx in zip(batch, np.argmax(logits, axis=-1)):
+                labels[i] = self.id2label[int(idx)]
+        return labels
+
+class StaticSentiment:
+    """Model2Vec static embeddings + a logistic-regression head: same interface as ORTSentiment, no transformer."""
+
+    # The head is always trained on SST-2 (0=negative, 1=positive), whatever checkpoint the
+    # embeddings were distilled from, so its output must not go through that checkpoint's id2label.
+    LABELS = ("NEGATIVE", "POSITIVE")
+
+    def __init__(self, model_dir):
+        # Optional dependency, only needed here (`pip install model2vec`; see optimize_model.py).
+        from model2vec import StaticModel
+        if not os.path.exists(os.path.join(model_dir, "static", "head.npz")):
+            raise ValueError(f"CRITICAL: static sentiment model not found in {model_dir}! Run `python optimize_model.py --ultrafast` first.")
+        self.model = StaticModel.from_pretrained(os.path.join(model_dir, "static"))
+        head = np.load(os.path.join(model_dir, "static", "head.npz"))
+        self.coef, self.intercept = head["coef"], head["intercept"]
+
+    def __call__(self, texts, batch_size=SENTIMENT_BATCH_SIZE):
+        """Classifies a list of texts, returning [{"label": ...}, ...]. Cheap enough to need no cache."""
+        if not texts:
+            return []
+        scores = self.model.encode(texts) @ self.coef + self.intercept
+        return [{"label": self.LABELS[int(score > 0)]} for score in scores]
+
+if SENTIMENT_BACKEND == "ultrafast":
+    print("Loading ULTRAFAST static sentiment classifier...")
+    sentiment_pipeline = StaticSentiment(SENTIMENT_MODEL_DIR)
+    print("Sentiment model loaded successfully.")
+else:
+    print(f"Loading {SENTIMENT_PRECISION.upper()} ONNX sentiment analysis model...")
+    sentiment_pipeline = ORTSentiment(SENTIMENT_MODEL_DIR, SENTIMENT_MODEL_FILES[SENTIMENT_PRECISION])
+    print(f"Sentiment model loaded successfully ({sentiment_pipeline.session.get_providers()[0]}).")
+# ORT releases the GIL and parallelises internally, so inference gets one dedicated thread:
+# the event loop stays free for Socket.IO traffic and concurrent searches queue up instead of
+# oversubscribing the intra-op pool.
+sentiment_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+class OrjsonSerializer:
+    """Stands in for the stdlib json module so python-socketio encodes packets with orjson."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # Socket.IO frames are text, and orjson's output is already compact.
+        return orjson.dumps(obj).decode()
+
+    loads = staticmethod(orjson.loads)
 
 fastapi_app = FastAPI()
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*", json=OrjsonSerializer)
 app = socketio.ASGIApp(sio, fastapi_app)
 
 # ==============================================================================
 # SECTION 2: GLOBAL STATE MANAGEMENT
 # ==============================================================================
 
+class RollingWordCounter:
+    """Word counts over a sliding window of the last `maxlen` words, maintained incrementally."""
+
+    def __init__(self, maxlen):
+        self.window = deque(maxlen=maxlen)
+        self.counts = Counter()
+
+    def add(self, word):
+        if len(self.window) == self.window.maxlen:
+            evicted = self.window[0]
+            self.counts[evicted] -= 1
+            if not self.counts[evicted]:
+                del self.counts[evicted]
+        self.window.append(word)
+        self.counts[word] += 1
+
+    def extend(self, words):
+        for word in words:
+            self.add(word)
+
+    def top(self, n):
+        """Returns the n most frequent (word, count) pairs in the window."""
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
 watched_brands = set()
-global_word_corpus = deque(maxlen=2000)
+# Shared HTTP/2 connection pool; opened on app startup, closed on shutdown.
+http_client = None
+global_word_corpus = RollingWordCounter(maxlen=2000)
 
 # ==============================================================================
 # SECTION 3: DATA FETCHING HELPERS (OPTIMIZED FOR BATCHING & 15 POSTS)
 # ==============================================================================
 
-def process_sentiments_in_batch(items, text_extractor):
-    """A helper to run sentiment analysis on a batch of items for max efficiency."""
-    texts_to_analyze = [text_extractor(item) for item in items]
-    if not texts_to_analyze:
-        return []
-    # This single call is much faster than many individual calls.
-    return sentiment_pipeline(texts_to_analyze)
+def process_sentiments_in_batch(mentions):
+    """Labels every mention with ONE batched model call, in place (the model handles length bucketing)."""
+    if not mentions:
+        return
+    results = sentiment_pipeline([m['_text'] for m in mentions], batch_size=SENTIMENT_BATCH_SIZE)
+    for mention, result in zip(mentions, results):
+        mention['sentiment'] = result['label']
+        del mention['_text']
 
-def fetch_news_api(brand_name, api_key, gnews_key):
-    """Fetches news with failover, now with batch sentiment analysis."""
+def as_utc(dt):
+    """Makes a parsed datetime timezone-aware, taking naive values as UTC."""
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        return dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+def strip_html(html):
+    """Returns the plain text of an HTML fragment with entities decoded, parsing at most MAX_HTML_LENGTH chars."""
+    if not html:
+        return ""
+    return HTMLParser(html[:MAX_HTML_LENGTH]).text(separator=' ')
+
+async def fetch_news_api(brand_name, api_key, gnews_key):
+    """Fetches news with failover. Sentiment is filled in later by run_search_flow."""
     all_articles = []
     try:
         # MODIFIED: Reduced pageSize to 15
         url = f"https://newsapi.org/v2/everything?q={brand_name}&apiKey={api_key}&pageSize=15&language=en"
-        articles = requests.get(url, timeout=API_TIMEOUT).json().get("articles", [])
+        articles = orjson.loads((await http_client.get(url)).content).get("articles", [])
         if articles: all_articles = articles
     except Exception as e: print(f"Warning: NewsAPI request failed: {e}.")
 
@@ -76,95 +296,97 @@ def fetch_news_api(brand_name, api_key, gnews_key):
         try:
             # MODIFIED: Reduced max to 15
             url = f"https://gnews.io/api/v4/search?q={brand_name}&token={gnews_key}&lang=en&max=15"
-            all_articles = requests.get(url, timeout=API_TIMEOUT).json().get('articles', [])
+            all_articles = orjson.loads((await http_client.get(url)).content).get('articles', [])
         except Exception as e: print(f"Error: GNews failover also failed: {e}")
     
-    sentiments = process_sentiments_in_batch(all_articles, lambda a: f"{a.get('title', '')}. {a.get('description', '')}")
-    
     mentions = []
-    for article, sentiment in zip(all_articles, sentiments):
+    for article in all_articles:
         title = article.get('title', '')
         if not title or title == '[Removed]': continue
+        published = as_utc(ciso8601.parse_datetime(article['publishedAt']))
         mentions.append({
             "platform": "News", "source": article.get('source', {}).get('name', 'Unknown Source'),
-            "text": title, "sentiment": sentiment['label'].upper(), "url": article.get('url'),
-            "timestamp": parser.parse(article['publishedAt']).isoformat()
+            "text": title, "_text": f"{title}. {article.get('description', '')}", "url": article.get('url'),
+            "timestamp": published.isoformat(), "_ts": published
         })
     return mentions
 
-def fetch_devto_mentions(brand_name):
-    """Fetches Dev.to articles with batch sentiment analysis."""
+async def fetch_devto_mentions(brand_name):
+    """Fetches Dev.to articles. Sentiment is filled in later by run_search_flow."""
     try:
         # MODIFIED: Reduced per_page to 15
         url = f"https://dev.to/api/articles?q={brand_name}&per_page=15"
-        articles = requests.get(url, timeout=API_TIMEOUT).json()
-        sentiments = process_sentiments_in_batch(articles, lambda a: f"{a.get('title', '')}. {a.get('description', '')}")
+        articles = orjson.loads((await http_client.get(url)).content)
         
         mentions = []
-        for article, sentiment in zip(articles, sentiments):
+        for article in articles:
             title = article.get('title', '')
             if not title: continue
-            timestamp = parser.parse(article['published_at']).isoformat() if 'published_at' in article else datetime.datetime.now().isoformat()
-            mentions.append({"platform": "Dev.to", "source": "Dev.to", "text": title, "sentiment": sentiment['label'].upper(), "url": article['url'], "timestamp": timestamp})
+            published = as_utc(ciso8601.parse_datetime(article['published_at'])) if 'published_at' in article else datetime.datetime.now(datetime.timezone.utc)
+            mentions.append({"platform": "Dev.to", "source": "Dev.to", "text": title, "_text": f"{title}. {article.get('description', '')}", "url": article['url'], "timestamp": published.isoformat(), "_ts": published})
         return mentions
     except Exception as e:
         print(f"Error: Could not fetch from Dev.to: {e}")
         return []
 
-def fetch_hacker_news_mentions(brand_name):
-    """Fetches Hacker News items with batch sentiment analysis."""
+async def fetch_hacker_news_mentions(brand_name):
+    """Fetches Hacker News items. Sentiment is filled in later by run_search_flow."""
     try:
         # MODIFIED: Reduced hitsPerPage to 15
         url = f"http://hn.algolia.com/api/v1/search?query={brand_name}&tags=story,comment&hitsPerPage=15"
-        hits = requests.get(url, timeout=API_TIMEOUT).json().get("hits", [])
-        sentiments = process_sentiments_in_batch(hits, lambda h: f"{h.get('title', '')}. {h.get('comment_text', '')[:MAX_CONTENT_LENGTH]}")
+        hits = orjson.loads((await http_client.get(url)).content).get("hits", [])
         
         mentions = []
-        for hit, sentiment in zip(hits, sentiments):
+        for hit in hits:
             title = hit.get("title", "")
-            comment_text = hit.get("comment_text", "")
+            comment_text = strip_html(hit.get("comment_text") or "")
             display_text = title if title else (comment_text[:100] + '...' if comment_text else '')
             if not display_text.strip(): continue
-            timestamp = datetime.datetime.fromtimestamp(hit['created_at_i'], tz=datetime.timezone.utc).isoformat() if 'created_at_i' in hit else datetime.datetime.now().isoformat()
-            mentions.append({"platform": "Hacker News", "source": "Hacker News", "text": display_text, "sentiment": sentiment['label'].upper(), "url": hit.get("story_url") or f"http://news.ycombinator.com/item?id={hit.get('objectID')}", "timestamp": timestamp})
+            created = datetime.datetime.fromtimestamp(hit['created_at_i'], tz=datetime.timezone.utc) if 'created_at_i' in hit else datetime.datetime.now(datetime.timezone.utc)
+            mentions.append({"platform": "Hacker News", "source": "Hacker News", "text": display_text, "_text": f"{title}. {comment_text}", "url": hit.get("story_url") or f"http://news.ycombinator.com/item?id={hit.get('objectID')}", "timestamp": created.isoformat(), "_ts": created})
         return mentions
     except Exception as e:
         print(f"Error: Could not fetch from Hacker News: {e}")
         return []
 
-def fetch_reddit_mentions(brand_name):
+async def fetch_reddit_mentions(brand_name):
     mentions = []
     try:
         # MODIFIED: Reduced limit to 15
         url = f"https://www.reddit.com/search.json?q={brand_name}&sort=new&limit=15"
-        posts = requests.get(url, headers={'User-Agent': 'AnEarOut/1.0'}, timeout=API_TIMEOUT).json().get("data", {}).get("children", [])
-        texts_to_process = [f"{p.get('data', {}).get('title', '')}. {p.get('data', {}).get('selftext', '')[:MAX_CONTENT_LENGTH]}" for p in posts]
-        sentiments = sentiment_pipeline(texts_to_process)
+        posts = orjson.loads((await http_client.get(url)).content).get("data", {}).get("children", [])
         
-        for post, sentiment in zip(posts, sentiments):
+        for post in posts:
             post_data = post.get("data", {})
             title = post_data.get("title", "")
             if not title: continue
-            timestamp = datetime.datetime.fromtimestamp(post_data['created_utc'], tz=datetime.timezone.utc).isoformat()
-            mentions.append({"platform": "Reddit", "source": f"r/{post_data.get('subreddit', 'unknown')}", "text": title, "sentiment": sentiment['label'].upper(), "url": f"https://www.reddit.com{post_data.get('permalink', '')}", "timestamp": timestamp})
+            created = datetime.datetime.fromtimestamp(post_data['created_utc'], tz=datetime.timezone.utc)
+            mentions.append({"platform": "Reddit", "source": f"r/{post_data.get('subreddit', 'unknown')}", "text": title, "_text": f"{title}. {post_data.get('selftext', '')}", "url": f"https://www.reddit.com{post_data.get('permalink', '')}", "timestamp": created.isoformat(), "_ts": created})
     except Exception as e: print(f"Error: Could not fetch from Reddit: {e}")
     return mentions
 
-def analyze_mention_summary(all_mentions):
-    if not all_mentions: return {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 100}
-    sentiment_counts = Counter(m['sentiment'] for m in all_mentions)
-    total = len(all_mentions)
-    positive_pct = round((sentiment_counts.get("POSITIVE", 0) / total) * 100)
-    negative_pct = round((sentiment_counts.get("NEGATIVE", 0) / total) * 100)
+def analyze_mention_summary(sentiment_counts, total):
+    """Turns running per-label counts into the percentage summary sent to the client."""
+    if not total: return {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 100}
+    positive_pct = round((sentiment_counts["POSITIVE"] / total) * 100)
+    negative_pct = round((sentiment_counts["NEGATIVE"] / total) * 100)
     return {"POSITIVE": positive_pct, "NEGATIVE": negative_pct, "NEUTRAL": 100 - positive_pct - negative_pct}
 
-def update_and_get_global_topics(new_mentions, brand_name):
+def _filter_words(texts, exclusion):
+    """
+    Yields the topic candidates in `texts`: lowercase words of 4+ chars not in `exclusion`.
+    Works one text at a time, so only a single mention's words are ever held in memory.
+    """
+    for text in texts:
+        for w in _TOPIC_WORD.findall(text.lower()):
+            if w not in exclusion:
+                yield w
+
+def update_and_get_global_topics(new_mentions, exclusion):
+    """`exclusion` is the stop words plus the lowercased brand, built once per search."""
     global global_word_corpus
-    all_text = " ".join(m['text'] for m in new_mentions)
-    cleaned = re.sub(r'\W+', ' ', all_text).lower()
-    words = [w for w in cleaned.split() if w not in stop_words and w not in {brand_name.lower()} and len(w) > 3]
-    global_word_corpus.extend(words)
-    return [word for word, freq in Counter(global_word_corpus).most_common(20)]
+    global_word_corpus.extend(_filter_words((m['text'] for m in new_mentions), exclusion))
+    return [word for word, freq in global_word_corpus.top(20)]
 
 
 # ==============================================================================
@@ -175,61 +397,82 @@ async def run_search_flow(sid, brand_name):
     """
     Orchestrates the search process with parallel fetching and batch processing.
     """
-    watched_brands.add(brand_name.lower())
+    brand_lower = brand_name.lower()
+    watched_brands.add(brand_lower)
+    # Stop words + the brand itself, so topic filtering is a single membership test per word.
+    exclusion = stop_words | {brand_lower}
     print(f"Starting new search for '{brand_name}'.")
     
-    # Create a list of coroutines to run concurrently.
-    tasks_to_run = [
-        asyncio.to_thread(fetch_news_api, brand_name, news_api_key, gnews_api_key),
-        asyncio.to_thread(fetch_hacker_news_mentions, brand_name),
-        asyncio.to_thread(fetch_reddit_mentions, brand_name),
-        asyncio.to_thread(fetch_devto_mentions, brand_name),
+    # Start every fetch at once on the shared HTTP client; each source is handled as soon as it lands.
+    fetch_tasks = [
+        asyncio.create_task(fetch_news_api(brand_name, news_api_key, gnews_api_key)),
+        asyncio.create_task(fetch_hacker_news_mentions(brand_name)),
+        asyncio.create_task(fetch_reddit_mentions(brand_name)),
+        asyncio.create_task(fetch_devto_mentions(brand_name)),
     ]
-
     print(f"--- Firing all API requests in parallel for '{brand_name}'... ---")
-    results = await asyncio.gather(*tasks_to_run, return_exceptions=True)
-    print(f"--- All API requests have completed for '{brand_name}'. Processing results... ---")
 
+    loop = asyncio.get_running_loop()
     current_search_mentions = []
-    for result in results:
-        if isinstance(result, Exception):
-            print(f"A fetching task failed with an exception: {result}")
-        elif result:
-            await sio.emit('mention_batch', result, to=sid)
-            current_search_mentions.extend(result)
-            # We can send a summary update after each successful batch.
-            summary_so_far = analyze_mention_summary(current_search_mentions)
-            await sio.emit('summary_update', {"sentiment": summary_so_far}, to=sid)
+    mention_times = []  # Parsed UTC datetimes, parallel to current_search_mentions.
+    # Updated per batch so each summary costs O(batch), not a recount of everything so far.
+    running_counts = dict.fromkeys(SENTIMENT_LABELS, 0)
+    for next_source in asyncio.as_completed(fetch_tasks):
+        try:
+            result = await next_source
+        except Exception as e:
+            print(f"A fetching task failed with an exception: {e}")
+            continue
+        if not result: continue
+
+        # One length-bucketed inference pass per source, so the first results stream out
+        # while slower sources are still in flight.
+        try:
+            await loop.run_in_executor(sentiment_executor, process_sentiments_in_batch, result)
+        except Exception as e:
+            print(f"Sentiment analysis failed for a source batch: {e}")
+            continue
+        for m in result:
+            running_counts[m['sentiment']] += 1
+            # The parsed datetime stays server-side for the activity filter; clients get the ISO string.
+            mention_times.append(m.pop('_ts'))
+        await sio.emit('mention_batch', result, to=sid)
+        current_search_mentions.extend(result)
+        # We can send a summary update after each successful batch.
+        summary_so_far = analyze_mention_summary(running_counts, len(current_search_mentions))
+        await sio.emit('summary_update', {"sentiment": summary_so_far}, to=sid)
 
     # --- Final Data Processing (After all parallel tasks are done) ---
     print(f"--- Search for '{brand_name}' finished. Sending final data packets. ---")
     now = datetime.datetime.now(datetime.timezone.utc)
     one_day_ago = now - datetime.timedelta(days=1)
     
-    # Safely filter timestamps for the activity chart.
-    activity_timestamps = []
-    for m in current_search_mentions:
-        try:
-            ts = parser.parse(m['timestamp'])
-            if ts.tzinfo is None or ts.tzinfo.utcoffset(ts) is None:
-                ts = ts.replace(tzinfo=datetime.timezone.utc)
-            if ts > one_day_ago:
-                activity_timestamps.append(m['timestamp'])
-        except (parser.ParserError, TypeError):
-            continue # Safely skip any unparseable timestamps
+    # Timestamps were parsed once at fetch time, so this is a plain datetime comparison.
+    activity_timestamps = [m['timestamp'] for m, ts in zip(current_search_mentions, mention_times) if ts > one_day_ago]
 
     await sio.emit('activity_update', activity_timestamps, to=sid)
     
-    final_topics = update_and_get_global_topics(current_search_mentions, brand_name)
+    final_topics = update_and_get_global_topics(current_search_mentions, exclusion)
     await sio.emit('summary_update', {"topics": final_topics}, to=sid)
     
     await sio.emit('search_complete', to=sid)
     print(f"--- All data sent for '{brand_name}'. Search complete. ---")
 
 # ==============================================================================
-# SECTION 5: SOCKET.IO EVENT HANDLERS
+# SECTION 5: APP LIFECYCLE & SOCKET.IO EVENT HANDLERS
 # ==============================================================================
 
+@fastapi_app.on_event("startup")
+async def open_http_client():
+    global http_client
+    # Connection failures are retried at the transport level, before any request bytes are sent.
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=2, limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    http_client = httpx.AsyncClient(transport=transport, timeout=API_TIMEOUT, follow_redirects=True, headers={'User-Agent': 'AnEarOut/1.0'})
+
+@fastapi_app.on_event("shutdown")
+async def close_http_client():
+    await http_client.aclose()
+
 @sio.on('start_search')
 async def handle_start_search(sid, data):
     brand_name = data.get('brand')
@@ -0,0 +1,145 @@
+# ==============================================================================
+# One-off build step: export the sentiment model to ONNX, then build the two
+# variants main.py can serve (picked with SENTIMENT_PRECISION):
+#   - fp16: half-precision weights, same accuracy as FP32 (the default)
+#   - int8: AVX-512 VNNI dynamic quantization, fastest but lossier
+# Run once before starting the server, after `pip install -r requirements-build.txt`
+# (render-build.sh does both for us):
+#
+#     python optimize_model.py              # build both variants
+#     python optimize_model.py --benchmark  # ...and compare them on SST-2 validation
+#     python optimize_model.py --ultrafast  # ...and distill the static classifier
+#
+# --ultrafast additionally builds the SENTIMENT_BACKEND=ultrafast model: Model2Vec
+# static embeddings distilled from the same model, plus a logistic-regression head
+# trained on SST-2. It needs `pip install "model2vec[distill]" scikit-learn datasets`
+# here, and `pip install model2vec` on the server that runs with SENTIMENT_BACKEND=ultrafast.
+# ==============================================================================
+
+import os
+import sys
+import time
+
+import onnx
+import torch
+from dotenv import load_dotenv
+from onnxconverter_common.float16 import convert_float_to_float16
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from optimum.onnxruntime import ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+# Supported checkpoints are sentiment classifiers whose id2label names are POSITIVE/NEGATIVE
+# (and optionally NEUTRAL), in any case: the default SST-2 DistilBERT, or
+# cardiffnlp/twitter-roberta-base-sentiment-latest for 3-class sentiment. main.py refuses to
+# start on anything else (e.g. LABEL_0 or star-rating labels). Set the same
+# SENTIMENT_MODEL_NAME for main.py so it finds the matching directory.
+# Read the same .env as main.py, so a model chosen there is the one that gets built.
+load_dotenv()
+MODEL_NAME = os.getenv("SENTIMENT_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
+# Must match main.py's SENTIMENT_MODEL_DIR (same env vars, same default: one directory per checkpoint).
+MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", MODEL_NAME.replace("/", "--")))
+FP32_MODEL_FILE = "model.onnx"
+FP32_MODEL_PATH = os.path.join(MODEL_DIR, FP32_MODEL_FILE)
+# ORTQuantizer names its output "<input stem>_<file_suffix>.onnx".
+INT8_MODEL_PATH = os.path.join(MODEL_DIR, "model_quantized.onnx")
+FP16_MODEL_PATH = os.path.join(MODEL_DIR, "model_fp16.onnx")
+STATIC_MODEL_DIR = os.path.join(MODEL_DIR, "static")
+STATIC_HEAD_PATH = os.path.join(STATIC_MODEL_DIR, "head.npz")
+ONNX_OPSET = 14
+
+def export_to_onnx():
+    """Exports the PyTorch model to an FP32 ONNX graph with dynamic batch/sequence axes."""
+    print(f"Exporting '{MODEL_NAME}' to ONNX (opset {ONNX_OPSET})...")
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).eval()
+
+    # The tokenizer and config (for id2label) are loaded from here at runtime.
+    tokenizer.save_pretrained(MODEL_DIR)
+    model.config.save_pretrained(MODEL_DIR)
+
+    dummy = tokenizer(["An ear out for the brand."], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        FP32_MODEL_PATH,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=ONNX_OPSET,
+        dynamo=False,
+    )
+
+def quantize_to_int8():
+    """Dynamically quantizes the exported graph to INT8, per-channel, targeting AVX-512 VNNI kernels."""
+    print("Quantizing ONNX model to INT8 (avx512_vnni)...")
+    quantizer = ORTQuantizer.from_pretrained(MODEL_DIR, file_name=FP32_MODEL_FILE)
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+    quantizer.quantize(save_dir=MODEL_DIR, quantization_config=qconfig, file_suffix="quantized")
+
+def convert_to_fp16():
+    """Casts the exported graph's weights to FP16, keeping int64 inputs and FP32 logits."""
+    print("Converting ONNX model to FP16...")
+    model = convert_float_to_float16(onnx.load(FP32_MODEL_PATH), keep_io_types=True)
+    onnx.save(model, FP16_MODEL_PATH)
+
+def benchmark(limit=872):
+    """
+    Reports accuracy and throughput of each variant on the SST-2 validation split (needs `datasets`).
+    Accuracy assumes the model's label ids match SST-2's (0=negative, 1=positive).
+    """
+    import numpy as np
+    import onnxruntime as ort
+    from datasets import load_dataset
+
+    dataset = load_dataset("glue", "sst2", split="validation").select(range(limit))
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+    sentences, expected = dataset["sentence"], np.array(dataset["label"])
+
+    for name, path in (("fp32", FP32_MODEL_PATH), ("fp16", FP16_MODEL_PATH), ("int8", INT8_MODEL_PATH)):
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        predictions = []
+        start = time.perf_counter()
+        for i in range(0, len(sentences), 32):
+            encoded = tokenizer(sentences[i:i + 32], padding=True, truncation=True, max_length=128, return_tensors="np")
+            logits = session.run(None, {"input_ids": encoded["input_ids"], "attention_mask": encoded["attention_mask"]})[0]
+            predictions.extend(np.argmax(logits, axis=-1))
+        elapsed = time.perf_counter() - start
+        accuracy = float(np.mean(np.array(predictions) == expected))
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{name}: accuracy={accuracy:.4f}  {len(sentences) / elapsed:.1f} texts/s  {size_mb:.0f}MB")
+
+def distill_static_classifier():
+    """Distills the model into static embeddings and fits a logistic-regression head on SST-2 train."""
+    import numpy as np
+    from datasets import load_dataset
+    from model2vec.distill import distill
+    from sklearn.linear_model import LogisticRegression
+
+    print("Distilling static embeddings with Model2Vec...")
+    static_model = distill(model_name=MODEL_NAME)
+    static_model.save_pretrained(STATIC_MODEL_DIR)
+
+    print("Training logistic-regression head on SST-2...")
+    train = load_dataset("glue", "sst2", split="train")
+    classifier = LogisticRegression(max_iter=1000)
+    classifier.fit(static_model.encode(train["sentence"]), train["label"])
+
+    validation = load_dataset("glue", "sst2", split="validation")
+    accuracy = classifier.score(static_model.encode(validation["sentence"]), validation["label"])
+    print(f"Static classifier SST-2 validation accuracy: {accuracy:.4f}")
+    np.savez(STATIC_HEAD_PATH, coef=classifier.coef_[0], intercept=classifier.intercept_[0])
+
+if __name__ == "__main__":
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    export_to_onnx()
+    quantize_to_int8()
+    convert_to_fp16()
+    print(f"Optimized models written to {MODEL_DIR}")
+    if "--benchmark" in sys.argv:
+        benchmark()
+    if "--ultrafast" in sys.argv:
+        distill_static_classifier()
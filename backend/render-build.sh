@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+# Exit on error
+set -o errexit
+
+pip install -r requirements.txt
+pip install -r requirements-build.txt
+
+# Export + quantize the sentiment model once at build time so startup only loads the ONNX file.
+python optimize_model.py